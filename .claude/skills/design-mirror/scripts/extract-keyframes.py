@@ -12,11 +12,33 @@ Notes:
 from __future__ import annotations
 
 import argparse
+import contextlib
+import functools
 import glob
+import hashlib
 import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 
+_KEYFRAMES_RE = re.compile(rb"@keyframes\s+([^\s{]+)\s*\{")
+# An unterminated comment runs to the end of the file
+_COMMENT_RE = re.compile(rb"/\*.*?(?:\*/|\Z)", re.S)
+
+# The NumPy matcher scans every brace in the file, so it only wins when the
+# blocks cover most of it and there is enough of them to outweigh the setup
+_VECTORIZE_MIN_BYTES = 1 << 20
+# Importing Numba and compiling the matcher costs close to a second per
+# process, so it is only worth it on runs that scan a lot of CSS
+_JIT_MIN_BYTES = 256 << 20
+
+# Below this much CSS, starting workers and pickling their blocks back costs
+# more than the parallel scan saves
+_POOL_MIN_BYTES = 128 << 20
+
+_jit_matcher = None
+
 
 @dataclass(frozen=True)
 class KeyframesBlock:
@@ -25,31 +47,204 @@ class KeyframesBlock:
     css: str
 
 
-def read_text(path: str) -> str:
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
         return f.read()
 
 
-def extract_keyframes_blocks(css_text: str, source_file: str) -> list[KeyframesBlock]:
+def _skip_comments(data: bytes, pos: int, stop: int) -> int:
+    """
+    Step over the /* */ comments opening in data[pos:stop], pos being outside one.
+
+    Returns where scanning resumes; a result past stop means stop is commented out.
+    """
+    while True:
+        c = data.find(b"/*", pos, stop)
+        if c < 0:
+            return pos
+        end = data.find(b"*/", c + 2)
+        if end < 0:
+            return len(data) + 1
+        pos = end + 2
+
+
+def _find_matching_brace(data: bytes, start: int) -> int:
+    """
+    Return the index of the `}` closing the `{` at start, or -1.
+
+    Hops from one `}` to the next and counts the `{` in between, stepping over
+    /* */ comments on the way.
+    """
+    depth = 1
+    pos = start + 1
+    while True:
+        close = data.find(b"}", pos)
+        if close < 0:
+            return -1
+        comment = data.find(b"/*", pos, close)
+        if comment >= 0:
+            depth += data.count(b"{", pos, comment)
+            pos = data.find(b"*/", comment + 2)
+            if pos < 0:
+                return -1
+            pos += 2
+            continue
+        depth += data.count(b"{", pos, close) - 1
+        if depth == 0:
+            return close
+        pos = close + 1
+
+
+def _load_jit_matcher():
+    """Import Numba and compile the SWAR matcher on first use; None without Numba."""
+    global _jit_matcher
+    if _jit_matcher is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:
+            _jit_matcher = False
+            return None
+
+        ones = np.uint64(0x0101010101010101)
+        low7 = np.uint64(0x7F7F7F7F7F7F7F7F)
+        open_word = np.uint64(0x7B7B7B7B7B7B7B7B)
+        close_word = np.uint64(0x7D7D7D7D7D7D7D7D)
+        slash_word = np.uint64(0x2F2F2F2F2F2F2F2F)
+
+        @njit
+        def count_zero_bytes(v):
+            # Exact per-byte zero test (no borrow false positives), then popcount
+            # of the 0x80 flags via a multiply that sums them into the top byte
+            t = ~(((v & low7) + low7) | v | low7)
+            return np.int64(((t >> np.uint64(7)) * ones) >> np.uint64(56))
+
+        @njit(boundscheck=False)
+        def match(data, words, start):
+            # Whole aligned words are skipped while they cannot close the block
+            # and hold no `/` that might open a comment; anything else is
+            # walked byte by byte
+            n = len(data)
+            aligned = len(words) * 8
+            depth = 0
+            i = start
+            while i < n:
+                if i % 8 == 0 and i < aligned:
+                    w = words[i // 8]
+                    closes = count_zero_bytes(w ^ close_word)
+                    if closes < depth and count_zero_bytes(w ^ slash_word) == 0:
+                        depth += count_zero_bytes(w ^ open_word) - closes
+                        i += 8
+                        continue
+                c = data[i]
+                if c == 0x7B:
+                    depth += 1
+                elif c == 0x7D:
+                    depth -= 1
+                    if depth == 0:
+                        return i
+                elif c == 0x2F and i + 1 < n and data[i + 1] == 0x2A:
+                    i += 2
+                    while i + 1 < n and not (data[i] == 0x2A and data[i + 1] == 0x2F):
+                        i += 1
+                    if i + 1 >= n:
+                        return -1
+                    i += 1
+                i += 1
+            return -1
+
+        def find_all(data: bytes, starts: list[int]) -> list[int]:
+            arr = np.frombuffer(data, dtype=np.uint8)
+            words = arr[: len(arr) // 8 * 8].view(np.uint64)
+            return [match(arr, words, start) for start in starts]
+
+        _jit_matcher = find_all
+    return _jit_matcher or None
+
+
+def _find_matching_braces(data: bytes, starts: list[int]) -> list[int] | None:
+    """
+    Vectorized _find_matching_brace for many starts at once.
+
+    Brace depth is computed with a single cumsum over all braces; the match for
+    an open brace that reaches depth d is the first later close back at d - 1.
+    Returns None when NumPy is not installed.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    arr = np.frombuffer(data, dtype=np.uint8)
+    is_brace = (arr == 0x7B) | (arr == 0x7D)
+    if b"/*" in data:
+        for m in _COMMENT_RE.finditer(data):
+            is_brace[m.start() : m.end()] = False
+    pos = np.flatnonzero(is_brace)
+    step = np.where(arr[pos] == 0x7B, 1, -1)
+    level = np.cumsum(step)  # depth after each brace
+
+    closes = step < 0
+    span = len(data) + 1
+    # Sort closes by (level, position) so each lookup is one searchsorted
+    keys = np.sort(level[closes] * span + pos[closes])
+    if len(keys) == 0:
+        return [-1] * len(starts)
+
+    starts_arr = np.asarray(starts, dtype=np.int64)
+    want = level[np.searchsorted(pos, starts_arr)] - 1
+    idx = np.searchsorted(keys, want * span + starts_arr)
+    hit = np.minimum(idx, len(keys) - 1)
+    found = (idx < len(keys)) & (keys[hit] // span == want)
+    return np.where(found, keys[hit] % span, -1).tolist()
+
+
+def extract_keyframes_blocks(data: bytes, source_file: str, jit: bool = False) -> list[KeyframesBlock]:
+    # Scan raw bytes; only the emitted blocks are decoded
+    matches = []
+    resume = 0
+    for m in _KEYFRAMES_RE.finditer(data):
+        if m.start() < resume:
+            continue
+        resume = _skip_comments(data, resume, m.start())
+        if resume <= m.start():
+            matches.append(m)
+            resume = m.end()
+    if not matches:
+        return []
+
+    starts = [m.end() - 1 for m in matches]
+    matcher = _load_jit_matcher() if jit else None
+    if matcher is not None:
+        ends = matcher(data, starts)
+    else:
+        # Estimate how much of the file the blocks cover from the first one
+        first = _find_matching_brace(data, starts[0])
+        covered = (first - starts[0]) * len(starts)
+        ends = None
+        if covered >= _VECTORIZE_MIN_BYTES and 2 * covered >= len(data):
+            ends = _find_matching_braces(data, starts)
+        if ends is None:
+            ends = [first] + [_find_matching_brace(data, start) for start in starts[1:]]
+
     blocks: list[KeyframesBlock] = []
-    for match in re.finditer(r"@keyframes\s+([^\s{]+)\s*\{", css_text):
-        name = match.group(1)
-        i = match.end() - 1
-        depth = 0
-        while i < len(css_text):
-            c = css_text[i]
-            if c == "{":
-                depth += 1
-            elif c == "}":
-                depth -= 1
-                if depth == 0:
-                    end = i + 1
-                    blocks.append(KeyframesBlock(name=name, file=source_file, css=css_text[match.start() : end]))
-                    break
-            i += 1
+    for match, end in zip(matches, ends):
+        if end < 0:
+            continue
+        blocks.append(
+            KeyframesBlock(
+                name=match.group(1).decode("utf-8", "replace"),
+                file=source_file,
+                css=data[match.start() : end + 1].decode("utf-8", "replace"),
+            )
+        )
     return blocks
 
 
+def _scan_one(path: str, jit: bool) -> list[KeyframesBlock]:
+    return extract_keyframes_blocks(read_bytes(path), os.path.basename(path), jit)
+
+
 def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("folder", help="Folder containing .css files")
@@ -58,10 +253,35 @@ def main() -> int:
     args = ap.parse_args()
 
     css_files = sorted(glob.glob(os.path.join(args.folder, "*.css")))
-    all_blocks: list[KeyframesBlock] = []
+    # Mirrors often ship the same stylesheet under several names; scan each once
+    pending: list[tuple[str, bytes]] = []
+    seen: set[bytes] = set()
+    total = 0
     for path in css_files:
-        text = read_text(path)
-        all_blocks.extend(extract_keyframes_blocks(text, os.path.basename(path)))
+        data = read_bytes(path)
+        if b"@keyframes" not in data:
+            continue
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        if digest in seen:
+            continue
+        seen.add(digest)
+        pending.append((path, data))
+        total += len(data)
+
+    # Files are independent, so large runs are scanned in parallel; workers get
+    # paths and read the files themselves rather than having bytes pickled over.
+    # Serial runs scan the bytes already read above
+    jit = total >= _JIT_MIN_BYTES
+    if total < _POOL_MIN_BYTES or len(pending) < 2 or (os.cpu_count() or 1) < 2:
+        results = [extract_keyframes_blocks(data, os.path.basename(path), jit) for path, data in pending]
+    else:
+        with ProcessPoolExecutor() as ex:
+            scan = functools.partial(_scan_one, jit=jit)
+            results = list(ex.map(scan, [path for path, _ in pending], chunksize=4))
+
+    all_blocks: list[KeyframesBlock] = []
+    for blocks in results:
+        all_blocks.extend(blocks)
 
     # Deduplicate by name keeping first appearance (minified CSS often repeats)
     dedup: dict[str, KeyframesBlock] = {}
@@ -71,28 +291,23 @@ def main() -> int:
     names = sorted(dedup.keys())
     names = names[: max(0, args.limit)]
 
-    out_lines: list[str] = []
-    out_lines.append(f"# Keyframes Extraction\n")
-    out_lines.append(f"- folder: `{os.path.abspath(args.folder)}`")
-    out_lines.append(f"- keyframes (unique): {len(dedup)}")
-    out_lines.append("")
-
-    for name in names:
-        b = dedup[name]
-        out_lines.append(f"## `{name}`")
-        out_lines.append(f"- source: `{b.file}`")
-        out_lines.append("")
-        out_lines.append("```css")
-        out_lines.append(b.css)
-        out_lines.append("```")
-        out_lines.append("")
-
-    output = "\n".join(out_lines)
-    if args.out:
-        with open(args.out, "w", encoding="utf-8") as f:
-            f.write(output)
-    else:
-        print(output)
+    # Stream straight to the destination instead of joining one big string
+    dest = open(args.out, "w", encoding="utf-8") if args.out else contextlib.nullcontext(sys.stdout)
+    with dest as out:
+        w = out.write
+        w("# Keyframes Extraction\n\n")
+        w(f"- folder: `{os.path.abspath(args.folder)}`\n")
+        w(f"- keyframes (unique): {len(dedup)}\n")
+
+        for name in names:
+            b = dedup[name]
+            w(f"\n## `{name}`\n")
+            w(f"- source: `{b.file}`\n\n")
+            w("```css\n")
+            w(b.css)
+            w("\n```\n")
+        if not args.out:
+            w("\n")  # print() used to end stdout output with a newline
 
     return 0
 
@@ -4,13 +4,14 @@ Style Extractor: Screenshot Optimizer
 Compresses and resizes screenshots to ensure they can be read by Claude Code.
 
 Usage:
-  python scripts/screenshot-optimizer.py <input> [--out output.jpg] [--max-width 1920] [--quality 85] [--max-size 2MB]
+  python scripts/screenshot-optimizer.py <input> [--out output.jpg] [--max-width 1920] [--quality 85] [--max-size 2MB] [--verbose]
 
 Options:
   --out         Output file path (default: input_optimized.jpg)
   --max-width   Maximum width in pixels (default: 1920)
   --quality     JPEG quality 1-100 (default: 85)
   --max-size    Maximum file size with unit (default: 2MB)
+  --verbose     Print resize steps while optimizing
 
 Examples:
   python scripts/screenshot-optimizer.py screenshot.png
@@ -19,15 +20,25 @@ Examples:
 
 Notes:
   - Automatically converts PNG to JPEG for better compression
-  - Iteratively reduces quality/size until target file size is reached
+  - Binary-searches JPEG quality, then reduces dimensions, until the target
+    file size is reached
   - Preserves aspect ratio when resizing
+  - Final encodes are progressive with optimized Huffman tables
+  - Pillow wheels already bundle libjpeg-turbo for encoding. When building
+    Pillow from source, link it against libjpeg-turbo (e.g. conda-forge):
+      CFLAGS="-mavx2" pip install --no-binary :all: pillow
+    pillow-simd is a drop-in replacement with SSE4/AVX2 resampling:
+      pip uninstall pillow && CC="cc -mavx2" pip install -U --force-reinstall pillow-simd
 """
 
 from __future__ import annotations
 
 import argparse
+import io
+import math
 import os
 import re
+import shutil
 import sys
 from pathlib import Path
 
@@ -37,11 +48,15 @@ except ImportError:
     print("Error: Pillow is required. Install with: pip install Pillow")
     sys.exit(1)
 
+OPTIMIZED_SUFFIX = '_optimized.jpg'
+
+_SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*(KB|MB|GB|B)?$')
+
 
 def parse_size(size_str: str) -> int:
     """Parse size string like '2MB' or '500KB' to bytes."""
     size_str = size_str.strip().upper()
-    match = re.match(r'^(\d+(?:\.\d+)?)\s*(KB|MB|GB|B)?$', size_str)
+    match = _SIZE_RE.match(size_str)
     if not match:
         raise ValueError(f"Invalid size format: {size_str}")
 
@@ -72,12 +87,188 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f}TB"
 
 
+def _encode_jpeg(img: Image.Image, quality: int, optimize: bool = False) -> bytes:
+    """
+    Encode an RGB image as JPEG in memory.
+
+    Size probes use the fast single-pass encoder; pass optimize=True for the
+    final encode to get optimized Huffman tables and progressive scans.
+    """
+    buf = io.BytesIO()
+    if optimize:
+        img.save(
+            buf, format='JPEG', quality=quality, optimize=True, progressive=True, subsampling='4:2:0'
+        )
+    else:
+        img.save(buf, format='JPEG', quality=quality)
+    return buf.getvalue()
+
+
+def _search_quality(
+    img: Image.Image,
+    min_quality: int,
+    max_quality: int,
+    max_size_bytes: int,
+    ratio: float
+) -> tuple[int | None, int]:
+    """
+    Binary-search the highest JPEG quality in [min_quality, max_quality] whose
+    final encode should fit max_size_bytes.
+
+    Probes use the fast encoder and their sizes are scaled by ratio, the
+    final/probe size ratio measured on this screenshot. Returns (quality,
+    estimated size); if nothing fits, quality is None and the size is the
+    estimate at min_quality.
+    """
+    best = None
+    lo, hi = min_quality, max_quality
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        size = int(len(_encode_jpeg(img, mid)) * ratio)
+        if size <= max_size_bytes:
+            best = (mid, size)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if best is None:
+        return None, size
+    return best
+
+
+def _finalize(
+    img: Image.Image,
+    quality: int,
+    min_quality: int,
+    max_size_bytes: int
+) -> tuple[int | None, bytes, int]:
+    """
+    Encode with the final settings, stepping quality down by 2 (not below
+    min_quality) while the result is over budget.
+
+    Returns (quality, encoded bytes, size of the first encode); quality is
+    None if nothing fit, with the min_quality encode as the bytes. The first
+    size is at the requested quality, for comparing against its estimate.
+    """
+    first_size = None
+    while True:
+        data = _encode_jpeg(img, quality, optimize=True)
+        if first_size is None:
+            first_size = len(data)
+        if len(data) <= max_size_bytes:
+            return quality, data, first_size
+        if quality <= min_quality:
+            return None, data, first_size
+        quality = max(min_quality, quality - 2)
+
+
+def _fit_width(
+    img: Image.Image,
+    quality: int,
+    max_size_bytes: int,
+    size: int,
+    ratio: float,
+    verbose: bool = False
+) -> tuple[Image.Image, int | None, bytes]:
+    """
+    Find the widest downscale of img that fits max_size_bytes at low quality.
+
+    Quality stays capped at 50 so the byte budget goes to resolution rather
+    than back to quality. Encoded size scales roughly with pixel count, so each
+    probe's estimated size gives the next width, kept between the widest fit
+    and the narrowest miss; widths are chosen from probes alone and only the
+    chosen one gets the final encode. If that encode misses, the ratio is
+    recalibrated and the new estimate gets one more probe, then the narrower
+    widths that probed as fitting are tried before the 400px floor. Every
+    resample starts from img so blur never compounds; BICUBIC is enough since
+    JPEG quantization error dominates here.
+
+    size is the estimated final size of img at the quality floor and ratio the
+    final/probe size ratio passed to _search_quality. Returns (image,
+    quality, encoded bytes); quality is None if nothing fits, and the bytes
+    are then the quality-20 final encode of the image, or b'' if none was made.
+    """
+    max_quality = min(50, quality)
+    best = None
+    fit_width, miss_width = 0, img.width
+    fit_widths = []
+    width = img.width
+    resamples, max_resamples = 0, 4
+    retried = False
+
+    while True:
+        new_width = int(width * math.sqrt(max_size_bytes / size) * 0.95)
+        new_width = max(400, fit_width + 1, min(new_width, miss_width - 1))
+        done = new_width >= miss_width or resamples >= max_resamples
+
+        if not done:
+            new_height = max(1, int(img.height * new_width / img.width))
+            current_img = img.resize((new_width, new_height), Image.BICUBIC)
+            resamples += 1
+            if verbose:
+                print(f"Reducing dimensions to {new_width}x{new_height}...")
+
+            min_quality = min(50 if new_width > 400 else 20, quality)
+            current_quality, size = _search_quality(current_img, min_quality, max_quality, max_size_bytes, ratio)
+            width = new_width
+
+            if current_quality is None:
+                if new_width == 400:
+                    return current_img, None, b''
+                miss_width = new_width
+                continue
+
+            best = (current_img, current_quality, min_quality, size)
+            fit_width = new_width
+            fit_widths.append(new_width)
+            # Stop when close to the budget or to the narrowest miss, or when
+            # even 400px only fit below the quality cap (wider needs more bytes)
+            done = (size >= 0.85 * max_size_bytes or miss_width - fit_width <= fit_width // 10
+                    or current_quality < max_quality)
+            if not done:
+                continue
+
+        if best is None:
+            break
+
+        # Only the chosen width gets the final encode
+        current_img, current_quality, min_quality, estimate = best
+        current_quality, data, first_size = _finalize(current_img, current_quality, min_quality, max_size_bytes)
+        if current_quality is not None:
+            return current_img, current_quality, data
+
+        # The final/probe ratio drifts with resolution; recalibrate on this
+        # encode (at the quality the estimate was for), treat the width as a
+        # miss and let the new estimate get a probe even past the cap
+        ratio *= first_size / estimate
+        miss_width, fit_width, best = fit_width, 0, None
+        width, size = current_img.width, first_size
+        if not retried:
+            max_resamples, retried = max(max_resamples, resamples + 1), True
+
+    # Estimates kept missing; try the narrower widths that probed as fitting,
+    # then the smallest allowed width
+    for new_width in sorted({w for w in fit_widths if 400 < w < miss_width}, reverse=True) + [400]:
+        current_img = img.resize((new_width, max(1, int(img.height * new_width / img.width))), Image.BICUBIC)
+        if verbose:
+            print(f"Reducing dimensions to {current_img.width}x{current_img.height}...")
+        min_quality = min(50 if new_width > 400 else 20, quality)
+        current_quality, _ = _search_quality(current_img, min_quality, max_quality, max_size_bytes, ratio)
+        if current_quality is None and new_width == 400:
+            return current_img, None, b''
+        current_quality, data, _ = _finalize(current_img, current_quality or min_quality, min_quality, max_size_bytes)
+        if current_quality is not None:
+            return current_img, current_quality, data
+    return current_img, None, data if min_quality == 20 else b''
+
+
 def optimize_screenshot(
     input_path: Path,
     output_path: Path,
     max_width: int = 1920,
     quality: int = 85,
-    max_size_bytes: int = 2 * 1024 * 1024
+    max_size_bytes: int = 2 * 1024 * 1024,
+    verbose: bool = False
 ) -> dict:
     """
     Optimize a screenshot by resizing and compressing.
@@ -106,65 +297,89 @@ def optimize_screenshot(
     result['input_size'] = get_file_size(input_path)
     result['input_dimensions'] = img.size
 
+    # Already a compliant JPEG: Image.open only parsed the header, so copy the
+    # file as-is instead of decoding and re-encoding it
+    if (img.format == 'JPEG' and img.mode in ('RGB', 'L')
+            and img.width <= max_width and result['input_size'] <= max_size_bytes):
+        if input_path.resolve() != output_path.resolve():
+            shutil.copyfile(input_path, output_path)
+        result['output_size'] = result['input_size']
+        result['output_dimensions'] = img.size
+        result['quality_used'] = None
+        result['success'] = True
+        result['message'] = f"Already within limits, copied unchanged: {format_size(result['input_size'])}"
+        return result
+
+    # Decide from the header alone; pixels are decoded once, by whichever step
+    # touches them first (a conversion, the resize, or the first encode)
+    needs_flatten = img.mode in ('RGBA', 'P', 'LA')
+    needs_rgb = img.mode != 'RGB'
+    needs_resize = img.width > max_width
+
+    # For JPEGs that will be downsized anyway, let libjpeg decode at a reduced
+    # DCT scale (1/2, 1/4, 1/8), keeping 2x headroom for the LANCZOS resize
+    if img.format == 'JPEG' and needs_resize:
+        img.draft('RGB', (max_width * 2, max(1, img.height * max_width * 2 // img.width)))
+
     # Convert to RGB if necessary (for JPEG output)
-    if img.mode in ('RGBA', 'P', 'LA'):
+    if needs_flatten:
         # Create white background for transparency
         background = Image.new('RGB', img.size, (255, 255, 255))
-        if img.mode == 'P':
+        if img.mode != 'RGBA':
             img = img.convert('RGBA')
-        background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+        background.paste(img, mask=img.getchannel('A'))
         img = background
-    elif img.mode != 'RGB':
+    elif needs_rgb:
         img = img.convert('RGB')
 
     # Resize if too wide
-    if img.width > max_width:
+    if needs_resize:
         ratio = max_width / img.width
-        new_size = (max_width, int(img.height * ratio))
+        new_size = (max_width, max(1, int(img.height * ratio)))
         img = img.resize(new_size, Image.LANCZOS)
-        print(f"Resized: {result['input_dimensions']} -> {new_size}")
+        if verbose:
+            print(f"Resized: {result['input_dimensions']} -> {new_size}")
 
-    # Iteratively compress until target size is reached
-    current_quality = quality
+    # Most screenshots already fit at the requested quality: try that with the
+    # final settings first, so the common case costs a single encode
     current_img = img
-    temp_path = output_path.with_suffix('.tmp.jpg')
-
-    while current_quality >= 20:
-        # Save with current quality
-        current_img.save(temp_path, format='JPEG', quality=current_quality, optimize=True)
-        current_size = get_file_size(temp_path)
-
-        if current_size <= max_size_bytes:
-            # Success - move temp to output
-            temp_path.rename(output_path)
-            result['output_size'] = current_size
-            result['output_dimensions'] = current_img.size
-            result['quality_used'] = current_quality
-            result['success'] = True
-            result['message'] = f"Optimized successfully: {format_size(result['input_size'])} -> {format_size(current_size)}"
-            return result
-
-        # Need further reduction
-        if current_quality > 50:
-            # Reduce quality first
-            current_quality -= 10
-            print(f"Reducing quality to {current_quality}...")
-        else:
+    current_quality, data, _ = _finalize(img, quality, quality, max_size_bytes)
+    # The quality-20 final encode of current_img, if one was made on the way
+    floor_data = data if quality == 20 else b''
+
+    if current_quality is None:
+        # Search for the highest quality that fits; only reduce dimensions once
+        # quality would have to drop below 50. Probes skip Huffman optimization
+        # and progressive scans, which can shrink flat screenshots 2x or more,
+        # so their sizes are scaled by the saving measured on this encode
+        can_shrink = img.width > 400  # Don't go too small
+        min_quality = min(50 if can_shrink else 20, quality)
+        ratio = len(data) / len(_encode_jpeg(img, quality))
+        current_quality, size = _search_quality(img, min_quality, quality, max_size_bytes, ratio)
+        if current_quality is not None:
+            current_quality, data, _ = _finalize(img, current_quality, min_quality, max_size_bytes)
+            size = len(data)
+            if current_quality is None and min_quality == 20:
+                floor_data = data
+
+        if current_quality is None and can_shrink:
             # Quality is already low, reduce dimensions
-            new_width = int(current_img.width * 0.8)
-            if new_width < 400:
-                break  # Don't go too small
-            new_height = int(current_img.height * 0.8)
-            current_img = current_img.resize((new_width, new_height), Image.LANCZOS)
-            print(f"Reducing dimensions to {new_width}x{new_height}...")
-
-    # Cleanup temp file if it exists
-    if temp_path.exists():
-        temp_path.unlink()
-
-    # Last resort - save with minimum quality
-    current_img.save(output_path, format='JPEG', quality=20, optimize=True)
-    result['output_size'] = get_file_size(output_path)
+            current_img, current_quality, data = _fit_width(img, quality, max_size_bytes, size, ratio, verbose)
+            floor_data = data
+
+    if current_quality is not None:
+        output_path.write_bytes(data)
+        result['output_size'] = len(data)
+        result['output_dimensions'] = current_img.size
+        result['quality_used'] = current_quality
+        result['success'] = True
+        result['message'] = f"Optimized successfully: {format_size(result['input_size'])} -> {format_size(result['output_size'])}"
+        return result
+
+    # Last resort - save with minimum quality, reusing that encode if made
+    data = floor_data or _encode_jpeg(current_img, 20, optimize=True)
+    output_path.write_bytes(data)
+    result['output_size'] = len(data)
     result['output_dimensions'] = current_img.size
     result['quality_used'] = 20
     result['success'] = True
@@ -182,6 +397,7 @@ def main() -> int:
     parser.add_argument('--max-width', type=int, default=1920, help='Maximum width (default: 1920)')
     parser.add_argument('--quality', type=int, default=85, help='JPEG quality 1-100 (default: 85)')
     parser.add_argument('--max-size', default='2MB', help='Maximum file size (default: 2MB)')
+    parser.add_argument('--verbose', action='store_true', help='Print resize steps while optimizing')
 
     args = parser.parse_args()
 
@@ -194,8 +410,7 @@ def main() -> int:
     if args.out:
         output_path = Path(args.out)
     else:
-        stem = input_path.stem
-        output_path = input_path.parent / f"{stem}_optimized.jpg"
+        output_path = input_path.parent / (input_path.stem + OPTIMIZED_SUFFIX)
 
     # Parse max size
     try:
@@ -216,13 +431,15 @@ def main() -> int:
         output_path=output_path,
         max_width=args.max_width,
         quality=args.quality,
-        max_size_bytes=max_size_bytes
+        max_size_bytes=max_size_bytes,
+        verbose=args.verbose
     )
 
     if result['success']:
         print(f"✓ {result['message']}")
         print(f"  Dimensions: {result['input_dimensions']} -> {result['output_dimensions']}")
-        print(f"  Quality: {result['quality_used']}")
+        if result['quality_used'] is not None:
+            print(f"  Quality: {result['quality_used']}")
         reduction = (1 - result['output_size'] / result['input_size']) * 100
         print(f"  Reduction: {reduction:.1f}%")
         return 0